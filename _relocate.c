@@ -0,0 +1,206 @@
+/*
+ * Pointer-relocation kernel for merge-aotcache.py.
+ *
+ * For every little-endian uint64 word, add d1 if the value lies in
+ * [b1, e1), else add d2 if it lies in [b2, e2). Matches the semantics of
+ * shift_pointers in merge-aotcache.py (deltas wrap modulo 2**64).
+ *
+ * Build next to the script; merge-aotcache.py picks it up via ctypes when
+ * present and otherwise falls back to its Numba/NumPy paths:
+ *
+ *   cc -O3 -funroll-loops -shared -fPIC -o _relocate.so _relocate.c
+ *
+ * On x86-64 the entry point dispatches at runtime to an AVX-512 kernel
+ * (8 words per compare/add) or an AVX2 kernel (4 words, unsigned compare
+ * emulated by biasing the sign bit). Elsewhere it runs the branchless
+ * scalar loop, which GCC/clang still auto-vectorize for the target ISA.
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+#if defined(__x86_64__) && (defined(__GNUC__) || defined(__clang__))
+#define HAVE_X86_DISPATCH 1
+#else
+#define HAVE_X86_DISPATCH 0
+#endif
+
+#if HAVE_X86_DISPATCH
+#include <immintrin.h>
+#endif
+
+static void relocate_scalar(uint64_t *arr, size_t n,
+                            uint64_t b1, uint64_t s1, uint64_t du1,
+                            uint64_t b2, uint64_t s2, uint64_t du2)
+{
+    size_t i;
+
+    for (i = 0; i < n; i++) {
+        uint64_t v = arr[i];
+        uint64_t m1 = (uint64_t)((v - b1) < s1);
+        uint64_t m2 = (uint64_t)((v - b2) < s2) & ~m1;
+        arr[i] = v + (du1 & -m1) + (du2 & -m2);
+    }
+}
+
+#if HAVE_X86_DISPATCH
+
+__attribute__((target("avx512f")))
+static void relocate_avx512(uint64_t *arr, size_t n,
+                            uint64_t b1, uint64_t s1, uint64_t du1,
+                            uint64_t b2, uint64_t s2, uint64_t du2)
+{
+    const __m512i b1v = _mm512_set1_epi64((int64_t)b1);
+    const __m512i s1v = _mm512_set1_epi64((int64_t)s1);
+    const __m512i d1v = _mm512_set1_epi64((int64_t)du1);
+    const __m512i b2v = _mm512_set1_epi64((int64_t)b2);
+    const __m512i s2v = _mm512_set1_epi64((int64_t)s2);
+    const __m512i d2v = _mm512_set1_epi64((int64_t)du2);
+    size_t i = 0;
+
+    for (; i + 8 <= n; i += 8) {
+        __m512i v = _mm512_loadu_si512((const void *)(arr + i));
+        __mmask8 m1 = _mm512_cmplt_epu64_mask(_mm512_sub_epi64(v, b1v), s1v);
+        __mmask8 m2 = _mm512_cmplt_epu64_mask(_mm512_sub_epi64(v, b2v), s2v)
+                      & (__mmask8)~m1;
+        v = _mm512_mask_add_epi64(v, m1, v, d1v);
+        v = _mm512_mask_add_epi64(v, m2, v, d2v);
+        _mm512_storeu_si512((void *)(arr + i), v);
+    }
+    relocate_scalar(arr + i, n - i, b1, s1, du1, b2, s2, du2);
+}
+
+__attribute__((target("avx2")))
+static void relocate_avx2(uint64_t *arr, size_t n,
+                          uint64_t b1, uint64_t s1, uint64_t du1,
+                          uint64_t b2, uint64_t s2, uint64_t du2)
+{
+    /* AVX2 only has a signed 64-bit compare; flipping the sign bit of both
+     * operands turns it into the unsigned compare the range test needs. */
+    const uint64_t bias = UINT64_C(0x8000000000000000);
+    const __m256i biasv = _mm256_set1_epi64x((int64_t)bias);
+    const __m256i b1v = _mm256_set1_epi64x((int64_t)b1);
+    const __m256i s1v = _mm256_set1_epi64x((int64_t)(s1 ^ bias));
+    const __m256i d1v = _mm256_set1_epi64x((int64_t)du1);
+    const __m256i b2v = _mm256_set1_epi64x((int64_t)b2);
+    const __m256i s2v = _mm256_set1_epi64x((int64_t)(s2 ^ bias));
+    const __m256i d2v = _mm256_set1_epi64x((int64_t)du2);
+    size_t i = 0;
+
+    for (; i + 4 <= n; i += 4) {
+        __m256i v = _mm256_loadu_si256((const __m256i *)(arr + i));
+        __m256i t1 = _mm256_xor_si256(_mm256_sub_epi64(v, b1v), biasv);
+        __m256i m1 = _mm256_cmpgt_epi64(s1v, t1);
+        __m256i t2 = _mm256_xor_si256(_mm256_sub_epi64(v, b2v), biasv);
+        __m256i m2 = _mm256_andnot_si256(m1, _mm256_cmpgt_epi64(s2v, t2));
+        v = _mm256_add_epi64(v, _mm256_and_si256(m1, d1v));
+        v = _mm256_add_epi64(v, _mm256_and_si256(m2, d2v));
+        _mm256_storeu_si256((__m256i *)(arr + i), v);
+    }
+    relocate_scalar(arr + i, n - i, b1, s1, du1, b2, s2, du2);
+}
+
+#endif /* HAVE_X86_DISPATCH */
+
+/*
+ * Fused copy + relocate: read each word from src, apply the shift, write
+ * to dst — one load and one store per cache line instead of a memcpy pass
+ * followed by an in-place scan. target_clones lets the compiler emit
+ * auto-vectorized AVX-512/AVX2 clones with ifunc dispatch, mirroring the
+ * manual dispatch of relocate() without triplicating the body.
+ *
+ * Both entry points specialize on window count at runtime: a single
+ * non-empty window runs a one-compare kernel, two empty windows collapse
+ * to a memcpy (or a no-op in place).
+ */
+
+#if HAVE_X86_DISPATCH
+__attribute__((target_clones("avx512f", "avx2", "default")))
+#endif
+static void relocate_copy2(uint64_t *restrict dst, const uint64_t *restrict src,
+                           size_t n,
+                           uint64_t b1, uint64_t s1, uint64_t du1,
+                           uint64_t b2, uint64_t s2, uint64_t du2)
+{
+    size_t i;
+
+    for (i = 0; i < n; i++) {
+        uint64_t v = src[i];
+        uint64_t m1 = (uint64_t)((v - b1) < s1);
+        uint64_t m2 = (uint64_t)((v - b2) < s2) & ~m1;
+        dst[i] = v + (du1 & -m1) + (du2 & -m2);
+    }
+}
+
+/* Single-window variant; also used in place (dst == src allowed). */
+#if HAVE_X86_DISPATCH
+__attribute__((target_clones("avx512f", "avx2", "default")))
+#endif
+static void relocate_copy1(uint64_t *dst, const uint64_t *src, size_t n,
+                           uint64_t b1, uint64_t s1, uint64_t du1)
+{
+    size_t i;
+
+    for (i = 0; i < n; i++) {
+        uint64_t v = src[i];
+        uint64_t m1 = (uint64_t)((v - b1) < s1);
+        dst[i] = v + (du1 & -m1);
+    }
+}
+
+void relocate_copy(uint64_t *dst, const uint64_t *src, size_t n,
+                   uint64_t b1, uint64_t e1, int64_t d1,
+                   uint64_t b2, uint64_t e2, int64_t d2)
+{
+    const uint64_t s1 = e1 - b1;
+    const uint64_t s2 = e2 - b2;
+
+    if (s1 == 0 && s2 == 0) {
+        if (dst != src)
+            memcpy(dst, src, n * 8);
+        return;
+    }
+    if (s2 == 0) {
+        relocate_copy1(dst, src, n, b1, s1, (uint64_t)d1);
+        return;
+    }
+    if (s1 == 0) {
+        relocate_copy1(dst, src, n, b2, s2, (uint64_t)d2);
+        return;
+    }
+    relocate_copy2(dst, src, n, b1, s1, (uint64_t)d1, b2, s2, (uint64_t)d2);
+}
+
+void relocate(uint64_t *arr, size_t n,
+              uint64_t b1, uint64_t e1, int64_t d1,
+              uint64_t b2, uint64_t e2, int64_t d2)
+{
+    const uint64_t s1 = e1 - b1;
+    const uint64_t s2 = e2 - b2;
+    const uint64_t du1 = (uint64_t)d1;
+    const uint64_t du2 = (uint64_t)d2;
+
+    if (s1 == 0 && s2 == 0)
+        return;
+    if (s2 == 0) {
+        relocate_copy1(arr, arr, n, b1, s1, du1);
+        return;
+    }
+    if (s1 == 0) {
+        relocate_copy1(arr, arr, n, b2, s2, du2);
+        return;
+    }
+
+#if HAVE_X86_DISPATCH
+    if (__builtin_cpu_supports("avx512f")) {
+        relocate_avx512(arr, n, b1, s1, du1, b2, s2, du2);
+        return;
+    }
+    if (__builtin_cpu_supports("avx2")) {
+        relocate_avx2(arr, n, b1, s1, du1, b2, s2, du2);
+        return;
+    }
+#endif
+    relocate_scalar(arr, n, b1, s1, du1, b2, s2, du2);
+}
@@ -13,10 +13,62 @@ requested base layout). Merged archive uses cache1's requested_base_address
 and cache1's header as template.
 """
 
+import collections
+import ctypes
 import mmap
 import os
 import struct
 import sys
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True, boundscheck=False)
+    def _shift_numba(arr, b1, e1, d1, b2, e2, d2):
+        """Parallel branchless conditional add over a uint64 view.
+
+        Compiled per-element loop auto-vectorizes and scales across cores,
+        avoiding the full-size mask temporaries of the NumPy path.
+        """
+        for i in numba.prange(arr.size):
+            v = arr[i]
+            if b1 <= v < e1:
+                arr[i] = v + d1
+            elif b2 <= v < e2:
+                arr[i] = v + d2
+
+# Optional compiled relocation kernel; see _relocate.c for the build line.
+# When _relocate.so sits next to this script it is preferred over the
+# Numba/NumPy paths (no Python-level dependency, auto-vectorized loop).
+_relocate = None
+_relocate_copy = None
+_relocate_so = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_relocate.so")
+if os.path.exists(_relocate_so):
+    _KERNEL_ARGTYPES = [
+        ctypes.c_void_p, ctypes.c_size_t,
+        ctypes.c_uint64, ctypes.c_uint64, ctypes.c_int64,
+        ctypes.c_uint64, ctypes.c_uint64, ctypes.c_int64,
+    ]
+    try:
+        _relocate = ctypes.CDLL(_relocate_so)
+        _relocate.relocate.argtypes = _KERNEL_ARGTYPES
+        _relocate.relocate.restype = None
+        _relocate_copy = getattr(_relocate, "relocate_copy", None)
+        if _relocate_copy is not None:
+            _relocate_copy.argtypes = [ctypes.c_void_p] + _KERNEL_ARGTYPES
+            _relocate_copy.restype = None
+    except (OSError, AttributeError):
+        _relocate = None
+        _relocate_copy = None
 
 # CDS layout (64-bit, matches cds.h and filemap.hpp)
 NUM_REGIONS = 5
@@ -36,6 +88,15 @@ CDS_DYNAMIC_ARCHIVE_MAGIC = 0xf00baba8
 DEFAULT_SHARED_BASE = 0x0000_0008_0000_0000
 
 
+# Precompiled codecs: skip the format-string parse and struct-module
+# attribute lookup on every header read/patch.
+_U32 = struct.Struct("<I")
+_I32 = struct.Struct("<i")
+_U64 = struct.Struct("<Q")
+# file_offset, mapping_offset, used are adjacent u64s within each region
+_REGION_TRIPLE = struct.Struct("<QQQ")
+
+
 def align_up(value: int, alignment: int) -> int:
     if alignment <= 0:
         return value
@@ -43,45 +104,45 @@ def align_up(value: int, alignment: int) -> int:
 
 
 def read_u32(buf: memoryview, off: int) -> int:
-    return struct.unpack_from("<I", buf, off)[0]
+    return _U32.unpack_from(buf, off)[0]
 
 
 def read_u64(buf: memoryview, off: int) -> int:
-    return struct.unpack_from("<Q", buf, off)[0]
+    return _U64.unpack_from(buf, off)[0]
 
 
 def write_u64(buf: memoryview, off: int, value: int) -> None:
-    struct.pack_into("<Q", buf, off, value & 0xFFFFFFFF_FFFFFFFF)
+    _U64.pack_into(buf, off, value & 0xFFFFFFFF_FFFFFFFF)
+
 
+# Parsed header fields. Attribute access is a C slot lookup, cheaper and
+# clearer than dict subscripting throughout the merge path.
+Region = collections.namedtuple("Region", "file_offset mapping_offset used")
+Header = collections.namedtuple(
+    "Header", "header_size alignment requested_base rw ro bm")
 
-def parse_header(data: memoryview):
-    """Parse generic header and a few regions. Returns dict."""
+
+def parse_header(data: memoryview) -> Header:
+    """Parse generic header and a few regions. Returns a Header."""
     header_size = read_u32(data, 12)
     if header_size > len(data):
         raise ValueError("header_size %u > buffer size" % header_size)
     alignment = read_u64(data, CORE_ALIGNMENT_OFF)
     requested_base = read_u64(data, REQUESTED_BASE_OFF)
 
-    def region(i: int):
+    unpack_region = _REGION_TRIPLE.unpack_from
+
+    def region(i: int) -> Region:
         base = REGIONS_START + i * REGION_SIZE
-        return {
-            "file_offset": read_u64(data, base + REGION_FILE_OFFSET_OFF),
-            "mapping_offset": read_u64(data, base + REGION_MAPPING_OFFSET_OFF),
-            "used": read_u64(data, base + REGION_USED_OFF),
-        }
-
-    return {
-        "header_size": header_size,
-        "alignment": alignment,
-        "requested_base": requested_base,
-        "rw": region(0),
-        "ro": region(1),
-        "bm": region(2),
-    }
+        return Region._make(
+            unpack_region(data, base + REGION_FILE_OFFSET_OFF))
+
+    return Header(header_size, alignment, requested_base,
+                  rw=region(0), ro=region(1), bm=region(2))
 
 
 def shift_pointers(
-    blob: bytearray,
+    blob,
     base_old: int,
     size_old: int,
     delta: int,
@@ -93,7 +154,125 @@ def shift_pointers(
     In-place: add delta to every 8-byte little-endian value in blob that
     lies in [base_old, base_old+size_old) or [also_ro_base, also_ro_base+also_ro_size).
     Used to relocate pointers from cache2's address space to merged layout.
+    blob is any writable buffer (bytearray, or a memoryview of the output
+    mmap so the shift runs in place on the mapping).
+
+    Uses NumPy when available: the blob is viewed as a uint64 array and the
+    deltas are applied with boolean masks in bulk, which is orders of
+    magnitude faster than a Python loop over hundreds of MB. Deltas may be
+    negative; they are applied modulo 2**64 (uint64 wraparound), matching
+    the masked write_u64 of the scalar path.
     """
+    if size_old == 0 and also_ro_size == 0:
+        return
+    if size_old == 0:
+        # Put the one live window first so the kernels take their
+        # single-window fast path.
+        base_old, size_old, delta = also_ro_base, also_ro_size, delta_ro
+        also_ro_base = also_ro_size = delta_ro = 0
+    if _relocate is not None:
+        n = len(blob) // 8
+        # Pass the raw address and drop the export before returning, so the
+        # caller can still close the mmap backing the buffer.
+        buf = (ctypes.c_char * (n * 8)).from_buffer(blob)
+        try:
+            _relocate.relocate(
+                ctypes.addressof(buf), n,
+                base_old, base_old + size_old, delta,
+                also_ro_base, also_ro_base + also_ro_size, delta_ro,
+            )
+        finally:
+            del buf
+        return
+    if np is None:
+        _shift_pointers_scalar(
+            blob, base_old, size_old, delta, also_ro_base, also_ro_size, delta_ro)
+        return
+    _shift_arr(np.frombuffer(blob, dtype=np.uint64, count=len(blob) // 8),
+               base_old, size_old, delta, also_ro_base, also_ro_size, delta_ro)
+
+
+_hi_buf = None
+_cand_buf = None
+
+
+def _scan_buffers(nwords):
+    """Reusable payload-sized scratch for the prefilter: one uint64 array
+    for the shifted high words and one bool mask, grown on demand and
+    shared by the RW and RO passes instead of reallocated per call."""
+    global _hi_buf, _cand_buf
+    if _hi_buf is None or _hi_buf.size < nwords:
+        _hi_buf = np.empty(nwords, dtype=np.uint64)
+        _cand_buf = np.empty(nwords, dtype=np.bool_)
+    return _hi_buf[:nwords], _cand_buf[:nwords]
+
+
+def _shift_arr(arr, base_old, size_old, delta, also_ro_base, also_ro_size,
+               delta_ro) -> None:
+    """Numba/NumPy relocation over a uint64 array (in place)."""
+    mask64 = 0xFFFFFFFF_FFFFFFFF
+    # Box every scalar into uint64 once up front; mixing Python ints into
+    # the array ops would re-convert them on each ufunc call. Masking the
+    # deltas keeps the wrap-modulo-2**64 semantics for negative shifts.
+    b1 = np.uint64(base_old)
+    e1 = np.uint64(base_old + size_old)
+    d1 = np.uint64(delta & mask64)
+    b2 = np.uint64(also_ro_base)
+    e2 = np.uint64(also_ro_base + also_ro_size)
+    d2 = np.uint64(delta_ro & mask64)
+
+    if numba is not None:
+        _shift_numba(arr, b1, e1, d1, b2, e2, d2)
+        return
+
+    # SWAR-style prefilter: both windows sit near the shared base
+    # (~0x8_0000_0000), so most words fail a cheap test on the high 32 bits
+    # alone. Run the full 64-bit range checks only on the candidates. The
+    # two payload-sized temporaries come from reusable scratch and are
+    # filled with out= ufuncs rather than fresh allocations.
+    hi_keys = sorted(
+        {h for base, size in ((base_old, size_old), (also_ro_base, also_ro_size))
+         if size > 0
+         for h in range(base >> 32, ((base + size - 1) >> 32) + 1)})
+    if not hi_keys:
+        return
+    hi, cand = _scan_buffers(arr.size)
+    np.right_shift(arr, np.uint64(32), out=hi)
+    if len(hi_keys) == 1:
+        np.equal(hi, np.uint64(hi_keys[0]), out=cand)
+    else:
+        cand[:] = np.isin(hi, np.asarray(hi_keys, dtype=np.uint64))
+    idx = np.nonzero(cand)[0]
+    if idx.size == 0:
+        return
+    sub = arr[idx]
+
+    # Test each window only if it is non-empty, and touch arr only when
+    # some candidate actually falls inside it. The first window wins when
+    # the two overlap, matching the elif of the scalar loop.
+    mask_rw = None
+    if size_old:
+        mask_rw = (sub >= b1) & (sub < e1)
+        if mask_rw.any():
+            arr[idx[mask_rw]] += d1
+    if also_ro_size:
+        mask_ro = (sub >= b2) & (sub < e2)
+        if mask_rw is not None:
+            mask_ro &= ~mask_rw
+        if mask_ro.any():
+            arr[idx[mask_ro]] += d2
+
+
+def _shift_pointers_scalar(
+    blob,
+    base_old: int,
+    size_old: int,
+    delta: int,
+    also_ro_base: int,
+    also_ro_size: int,
+    delta_ro: int,
+) -> None:
+    """Pure-Python fallback for shift_pointers when NumPy is unavailable."""
     n = len(blob) // 8
     for i in range(n):
         off = i * 8
@@ -104,46 +283,236 @@ def shift_pointers(
             write_u64(blob, off, val + delta_ro)
 
 
-def merge(cache1_path: str, cache2_path: str, out_path: str) -> None:
-    with open(cache1_path, "rb") as f1, open(cache2_path, "rb") as f2:
-        len1 = os.fstat(f1.fileno()).st_size
-        len2 = os.fstat(f2.fileno()).st_size
-        m1 = mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ)
-        m2 = mmap.mmap(f2.fileno(), 0, access=mmap.ACCESS_READ)
-
+def copy_into_output(src_f, out_f, out_m, src_off: int, dst_off: int, length: int) -> None:
+    """
+    Copy length bytes from src_f at src_off to the output file at dst_off.
+    Stays in the kernel where possible: copy_file_range first (reflink/COW
+    capable on btrfs/XFS), then sendfile, then a userspace bounce into the
+    output mapping on platforms with neither.
+    """
+    if length <= 0:
+        return
+    src_fd = src_f.fileno()
+    out_fd = out_f.fileno()
+    if hasattr(os, "copy_file_range"):
+        try:
+            copied = 0
+            while copied < length:
+                n = os.copy_file_range(src_fd, out_fd, length - copied,
+                                       offset_src=src_off + copied,
+                                       offset_dst=dst_off + copied)
+                if n == 0:
+                    break
+                copied += n
+            if copied == length:
+                return
+        except OSError:
+            pass  # e.g. ENOSYS/EXDEV on older kernels; try the next path
+    if hasattr(os, "sendfile"):
+        try:
+            os.lseek(out_fd, dst_off, os.SEEK_SET)
+            copied = 0
+            while copied < length:
+                n = os.sendfile(out_fd, src_fd, src_off + copied, length - copied)
+                if n == 0:
+                    break
+                copied += n
+            if copied == length:
+                return
+        except OSError:
+            pass
+    out_m[dst_off:dst_off + length] = os.pread(src_fd, length, src_off)
+
+
+def advise_input(f, h) -> None:
+    """
+    Tell the kernel the RW/RO/BM payloads of an input will be read
+    sequentially soon: enlarges the readahead window and prefetches the
+    ranges into the page cache before the copy/shift passes touch them.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = f.fileno()
+    for r in (h.rw, h.ro, h.bm):
+        if r.used == 0:
+            continue
+        try:
+            os.posix_fadvise(fd, r.file_offset, r.used, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, r.file_offset, r.used, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+
+
+def madvise_range(m, option_name: str, start: int = 0, length: int = None) -> None:
+    """
+    madvise a window of a mapping, aligning the start down to a page
+    boundary as the kernel requires. No-op where the mmap module lacks
+    madvise or the platform lacks the option (e.g. MADV_HUGEPAGE).
+    """
+    option = getattr(mmap, option_name, None)
+    if option is None or not hasattr(m, "madvise"):
+        return
+    page = mmap.PAGESIZE
+    aligned = start - start % page
+    if length is None:
+        length = len(m) - aligned
+    else:
+        length = min(length + (start - aligned), len(m) - aligned)
+    if length <= 0:
+        return
     try:
+        m.madvise(option, aligned, length)
+    except (OSError, ValueError):
+        pass
+
+
+def relocate_region(m2, src_off: int, out_m, dst_off: int, length: int,
+                    base_old: int, size_old: int, delta: int,
+                    also_ro_base: int, also_ro_size: int, delta_ro: int,
+                    scratch=None) -> None:
+    """
+    Copy length bytes of cache2 payload from m2[src_off:] into
+    out_m[dst_off:], relocating pointers in the same pass so each word is
+    loaded and stored exactly once (fused copy+shift). scratch is an
+    optional reusable uint64 staging array for the NumPy path. Falls back
+    to copy-then-shift when neither the compiled kernel nor NumPy is
+    available.
+    """
+    if length <= 0:
+        return
+    if size_old == 0:
+        # Single live window first, as in shift_pointers.
+        base_old, size_old, delta = also_ro_base, also_ro_size, delta_ro
+        also_ro_base = also_ro_size = delta_ro = 0
+    n = length // 8
+    tail = length - n * 8
+    if tail:
+        out_m[dst_off + n * 8:dst_off + length] = \
+            memoryview(m2)[src_off + n * 8:src_off + length]
+    if n == 0:
+        return
+    if _relocate_copy is not None and np is not None:
+        dst = (ctypes.c_char * (n * 8)).from_buffer(out_m, dst_off)
+        try:
+            src = np.frombuffer(m2, dtype=np.uint8, count=n * 8, offset=src_off)
+            _relocate_copy(
+                ctypes.addressof(dst), src.ctypes.data, n,
+                base_old, base_old + size_old, delta,
+                also_ro_base, also_ro_base + also_ro_size, delta_ro,
+            )
+        finally:
+            del dst
+        return
+    if np is not None:
+        chunk = scratch[:n] if scratch is not None and scratch.size >= n \
+            else np.empty(n, dtype=np.uint64)
+        np.copyto(chunk, np.frombuffer(m2, dtype=np.uint64, count=n, offset=src_off))
+        _shift_arr(chunk, base_old, size_old, delta,
+                   also_ro_base, also_ro_size, delta_ro)
+        out_m[dst_off:dst_off + n * 8] = memoryview(chunk).cast("B")
+        return
+    # No vector kernels: plain copy, then shift in place on the mapping.
+    out_m[dst_off:dst_off + n * 8] = memoryview(m2)[src_off:src_off + n * 8]
+    shift_pointers(memoryview(out_m)[dst_off:dst_off + n * 8],
+                   base_old, size_old, delta,
+                   also_ro_base, also_ro_size, delta_ro)
+
+
+def _prefault(m, offset: int, length: int) -> None:
+    """Touch one byte per page to pull a mapped range into memory. Run on
+    a background thread as a poor man's prefetch where posix_fadvise is
+    unavailable."""
+    page = mmap.PAGESIZE
+    end = min(offset + length, len(m))
+    for off in range(offset, end, page):
+        m[off]
+
+
+def map_readonly(f) -> mmap.mmap:
+    """
+    Map a whole input file read-only. Where the platform exposes
+    MAP_POPULATE (Linux), prefault the pages at map time so the sequential
+    copy/relocate passes take no per-page minor faults later.
+    """
+    populate = getattr(mmap, "MAP_POPULATE", 0)
+    if populate and hasattr(mmap, "PROT_READ"):
+        try:
+            return mmap.mmap(f.fileno(), 0,
+                             flags=mmap.MAP_SHARED | populate,
+                             prot=mmap.PROT_READ)
+        except (OSError, ValueError):
+            pass
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def merge(cache1_path: str, cache2_path: str, out_path: str,
+          fsync: bool = False) -> None:
+    # One persistent fd and mapping per input, reused for every read below.
+    # Re-opening per region costs openat/fstat/close each time and resets
+    # the kernel's per-fd sequential readahead heuristic.
+    with open(cache1_path, "rb") as f1, open(cache2_path, "rb") as f2, \
+            map_readonly(f1) as m1, map_readonly(f2) as m2:
         h1 = parse_header(m1)
         h2 = parse_header(m2)
-    finally:
-        m1.close()
-        m2.close()
-
+        advise_input(f1, h1)
+        advise_input(f2, h2)
+        # Same hints on the mappings themselves: each input is read linearly
+        # exactly once, so ask for aggressive readahead up front ...
+        for m, h in ((m1, h1), (m2, h2)):
+            madvise_range(m, "MADV_SEQUENTIAL")
+            for r in (h.rw, h.ro, h.bm):
+                if r.used:
+                    madvise_range(m, "MADV_WILLNEED", r.file_offset, r.used)
+        # The WILLNEED advice above already queues RO2's readahead before
+        # the RW2 relocation starts, overlapping its disk I/O with compute.
+        # Without posix_fadvise, fake it with a background prefault thread.
+        prefetcher = None
+        if not hasattr(os, "posix_fadvise") and h2.ro.used:
+            prefetcher = threading.Thread(
+                target=_prefault, args=(m2, h2.ro.file_offset, h2.ro.used),
+                daemon=True)
+            prefetcher.start()
+        try:
+            _merge_into(cache1_path, cache2_path, f1, m1, m2, out_path, h1, h2,
+                        fsync=fsync)
+        finally:
+            # m2 must outlive the prefetcher; join before the mappings close.
+            if prefetcher is not None:
+                prefetcher.join()
+        # ... and release the pages afterwards; they will never be
+        # re-referenced and would only evict hotter data.
+        madvise_range(m1, "MADV_DONTNEED")
+        madvise_range(m2, "MADV_DONTNEED")
+
+
+def _merge_into(cache1_path, cache2_path, f1, m1, m2, out_path, h1, h2,
+                fsync=False):
     # Use cache1's alignment and requested base for merged file
-    alignment = h1["alignment"]
-    requested_base1 = h1["requested_base"] or DEFAULT_SHARED_BASE
-    requested_base2 = h2["requested_base"] or DEFAULT_SHARED_BASE
-    if (h1["requested_base"] or h2["requested_base"]) == 0:
+    alignment = h1.alignment
+    requested_base1 = h1.requested_base or DEFAULT_SHARED_BASE
+    requested_base2 = h2.requested_base or DEFAULT_SHARED_BASE
+    if (h1.requested_base or h2.requested_base) == 0:
         print("Warning: requested_base_address is 0 in header; using default 0x%x for pointer relocation"
               % DEFAULT_SHARED_BASE, file=sys.stderr)
-    rw1, ro1, bm1 = h1["rw"], h1["ro"], h1["bm"]
-    rw2, ro2 = h2["rw"], h2["ro"]
+    rw1, ro1, bm1 = h1.rw, h1.ro, h1.bm
+    rw2, ro2 = h2.rw, h2.ro
 
     # Inside a region (rw or ro), HotSpot does NOT insert extra padding – it
     # just dumps a contiguous blob. Padding is only used to align the *start*
     # of each region in the file. Follow that here: concat rw1+rw2 and ro1+ro2
     # without internal padding, and only align between regions.
-    rw1_used = rw1["used"]
-    rw2_used = rw2["used"]
-    ro1_used = ro1["used"]
-    ro2_used = ro2["used"]
-    bm1_used = bm1["used"]
+    rw1_used = rw1.used
+    rw2_used = rw2.used
+    ro1_used = ro1.used
+    ro2_used = ro2.used
+    bm1_used = bm1.used
 
     merged_rw_used = rw1_used + rw2_used
     merged_ro_used = ro1_used + ro2_used
 
     # Layout:
     #   [header][pad] [rw (rw1+rw2)] [pad] [ro (ro1+ro2)] [pad] [bm1]
-    out_rw_file_off = align_up(h1["header_size"], alignment)
+    out_rw_file_off = align_up(h1.header_size, alignment)
     rw_end = out_rw_file_off + merged_rw_used
     out_ro_file_off = align_up(rw_end, alignment)
     ro_end = out_ro_file_off + merged_ro_used
@@ -161,121 +530,137 @@ def merge(cache1_path: str, cache2_path: str, out_path: str) -> None:
     # Old cache2 RW block:  abs_old = requested_base2 + (rw2.file_offset + inner)
     # New merged RW2 block: abs_new = requested_base1 + (out_rw_file_off + rw1_used + inner)
     new_rw2_start = requested_base1 + (out_rw_file_off + rw1_used)
-    old_rw2_start = requested_base2 + rw2["file_offset"]
+    old_rw2_start = requested_base2 + rw2.file_offset
     delta_rw = new_rw2_start - old_rw2_start
 
     # Old cache2 RO block:  abs_old = requested_base2 + (ro2.file_offset + inner)
     # New merged RO2 block: abs_new = requested_base1 + (out_ro_file_off + ro1_used + inner)
     new_ro2_start = requested_base1 + (out_ro_file_off + ro1_used)
-    old_ro2_start = requested_base2 + ro2["file_offset"]
+    old_ro2_start = requested_base2 + ro2.file_offset
     delta_ro = new_ro2_start - old_ro2_start
 
-    # Build output with one header and merged rw/ro (+ bitmap from cache1)
-    with open(out_path, "wb") as out_f:
-        out_f.truncate(total_size)
-
-    with open(out_path, "r+b") as out_f:
+    # Build output with one header and merged rw/ro (+ bitmap from cache1).
+    # Keep the output fd open alongside the mapping: the cache1 regions are
+    # copied file-to-file in the kernel (copy_file_range/sendfile), which is
+    # coherent with the MAP_SHARED mapping used for patching and relocation.
+    with open(out_path, "w+b") as out_f:
+        # posix_fallocate reserves contiguous extents without the zero-fill
+        # and metadata churn ftruncate can trigger on some filesystems.
+        try:
+            os.posix_fallocate(out_f.fileno(), 0, total_size)
+        except (AttributeError, OSError):
+            out_f.truncate(total_size)
         out_m = mmap.mmap(out_f.fileno(), total_size, access=mmap.ACCESS_WRITE)
-
-    try:
-        # 1) Copy header from cache1 and patch region 0 and 1
-        with open(cache1_path, "rb") as f1:
-            header_bytes = f1.read(h1["header_size"])
-        out_m[:h1["header_size"]] = header_bytes
-
-        # Patch region 0 (rw): file_offset, used
-        r0_base = REGIONS_START + 0 * REGION_SIZE
-        write_u64(out_m, r0_base + REGION_FILE_OFFSET_OFF, out_rw_file_off)
-        write_u64(out_m, r0_base + REGION_USED_OFF, merged_rw_used)
-
-        # Patch region 1 (ro): file_offset, used
-        r1_base = REGIONS_START + 1 * REGION_SIZE
-        write_u64(out_m, r1_base + REGION_FILE_OFFSET_OFF, out_ro_file_off)
-        write_u64(out_m, r1_base + REGION_USED_OFF, merged_ro_used)
-
-        # Patch Bitmap region (2): keep its original contents from cache1 but
-        # move it after the merged RO region so the JVM can map region #2.
-        bm_base = REGIONS_START + 2 * REGION_SIZE
-        write_u64(out_m, bm_base + REGION_FILE_OFFSET_OFF, out_bm_file_off)
-        write_u64(out_m, bm_base + REGION_USED_OFF, bm1_used)
-
-        # Zero CRCs so VM doesn't trust stale checksums (optional; VM may still reject)
-        struct.pack_into("<I", out_m, 4, 0)
-        struct.pack_into("<i", out_m, r0_base, 0)
-        struct.pack_into("<i", out_m, r1_base, 0)
-
-        # 2) Copy RW: cache1 rw, then cache2 rw (with pointer shift), no
-        # internal padding – just a contiguous blob.
-        with open(cache1_path, "rb") as f1:
-            f1.seek(rw1["file_offset"])
-            rw1_data = f1.read(rw1_used)
-        out_m[out_rw_file_off:out_rw_file_off + rw1_used] = rw1_data
-
-        with open(cache2_path, "rb") as f2:
-            f2.seek(rw2["file_offset"])
-            rw2_data = bytearray(f2.read(rw2["used"]))
-        shift_pointers(
-            rw2_data,
-            old_rw2_start,
-            rw2["used"],
-            delta_rw,
-            old_ro2_start,
-            ro2["used"],
-            delta_ro,
-        )
-        rw2_off = out_rw_file_off + rw1_used
-        out_m[rw2_off:rw2_off + rw2_used] = rw2_data
-
-        # 3) Copy RO: cache1 ro, then cache2 ro (with pointer shift), again
-        # as a contiguous blob.
-        with open(cache1_path, "rb") as f1:
-            f1.seek(ro1["file_offset"])
-            ro1_data = f1.read(ro1_used)
-        out_m[out_ro_file_off:out_ro_file_off + ro1_used] = ro1_data
-
-        with open(cache2_path, "rb") as f2:
-            f2.seek(ro2["file_offset"])
-            ro2_data = bytearray(f2.read(ro2["used"]))
-        shift_pointers(
-            ro2_data,
-            old_rw2_start,
-            rw2["used"],
-            delta_rw,
-            old_ro2_start,
-            ro2["used"],
-            delta_ro,
-        )
-        ro2_off = out_ro_file_off + ro1_used
-        out_m[ro2_off:ro2_off + ro2_used] = ro2_data
-
-        # 4) Copy Bitmap region (from cache1) after merged RO, including padding
-        if bm1_used > 0:
-            with open(cache1_path, "rb") as f1:
-                f1.seek(bm1["file_offset"])
-                bm_data = f1.read(bm1_used)
-            out_m[out_bm_file_off:out_bm_file_off + bm1_used] = bm_data
-            # zero padding up to bm1_aligned
-            pad_bm = bm1_aligned - bm1_used
-            if pad_bm > 0:
-                out_m[out_bm_file_off + bm1_used:out_bm_file_off + bm1_aligned] = bytes(pad_bm)
-
-        out_m.flush()
-    finally:
-        out_m.close()
+        madvise_range(out_m, "MADV_SEQUENTIAL")
+        # Huge pages over the merged payloads cut TLB misses during the
+        # in-place pointer-shift scan (no-op where unsupported).
+        madvise_range(out_m, "MADV_HUGEPAGE", out_rw_file_off, merged_rw_used)
+        madvise_range(out_m, "MADV_HUGEPAGE", out_ro_file_off, merged_ro_used)
+
+        try:
+            # 1) Copy header from cache1 and patch region 0 and 1. The
+            # header bytes come straight from the live m1 mapping (a C
+            # memcpy) — the very bytes parse_header validated, with no
+            # window for the file to change under a re-read.
+            out_m[:h1.header_size] = m1[:h1.header_size]
+
+            # Patch regions 0 (rw), 1 (ro) and the Bitmap region (2):
+            # file_offset and used. The bitmap keeps its original contents
+            # from cache1 but moves after the merged RO region so the JVM
+            # can map region #2.
+            pack_u64 = _U64.pack_into
+            r0_base = REGIONS_START + 0 * REGION_SIZE
+            r1_base = REGIONS_START + 1 * REGION_SIZE
+            bm_base = REGIONS_START + 2 * REGION_SIZE
+            pack_u64(out_m, r0_base + REGION_FILE_OFFSET_OFF, out_rw_file_off)
+            pack_u64(out_m, r0_base + REGION_USED_OFF, merged_rw_used)
+            pack_u64(out_m, r1_base + REGION_FILE_OFFSET_OFF, out_ro_file_off)
+            pack_u64(out_m, r1_base + REGION_USED_OFF, merged_ro_used)
+            pack_u64(out_m, bm_base + REGION_FILE_OFFSET_OFF, out_bm_file_off)
+            pack_u64(out_m, bm_base + REGION_USED_OFF, bm1_used)
+
+            # Zero CRCs so VM doesn't trust stale checksums (optional; VM may still reject)
+            _U32.pack_into(out_m, 4, 0)
+            _I32.pack_into(out_m, r0_base, 0)
+            _I32.pack_into(out_m, r1_base, 0)
+
+            # 2) Copy RW: cache1 rw, then cache2 rw (with pointer shift), no
+            # internal padding – just a contiguous blob.
+            copy_into_output(f1, out_f, out_m, rw1.file_offset, out_rw_file_off, rw1_used)
+
+            # Fused copy+shift: each RW2/RO2 word is loaded from cache2 and
+            # stored relocated into the output mapping exactly once. The
+            # NumPy path stages through one scratch array shared by both
+            # regions; the compiled kernel streams mapping-to-mapping.
+            scratch = None
+            if np is not None and _relocate_copy is None:
+                scratch = np.empty(max(rw2_used, ro2_used) // 8, dtype=np.uint64)
+            rw2_off = out_rw_file_off + rw1_used
+            relocate_region(
+                m2, rw2.file_offset, out_m, rw2_off, rw2_used,
+                old_rw2_start, rw2_used, delta_rw,
+                old_ro2_start, ro2_used, delta_ro, scratch,
+            )
+
+            # 3) Copy RO: cache1 ro, then cache2 ro (with pointer shift), again
+            # as a contiguous blob.
+            copy_into_output(f1, out_f, out_m, ro1.file_offset, out_ro_file_off, ro1_used)
+
+            ro2_off = out_ro_file_off + ro1_used
+            relocate_region(
+                m2, ro2.file_offset, out_m, ro2_off, ro2_used,
+                old_rw2_start, rw2_used, delta_rw,
+                old_ro2_start, ro2_used, delta_ro, scratch,
+            )
+
+            # 4) Copy Bitmap region (from cache1) after merged RO, including padding
+            if bm1_used > 0:
+                copy_into_output(f1, out_f, out_m, bm1.file_offset, out_bm_file_off, bm1_used)
+                # zero padding up to bm1_aligned
+                pad_bm = bm1_aligned - bm1_used
+                if pad_bm > 0:
+                    out_m[out_bm_file_off + bm1_used:out_bm_file_off + bm1_aligned] = bytes(pad_bm)
+
+            # No flush by default: msync(MS_SYNC) is a synchronous disk
+            # barrier over every dirty page, often the largest single cost
+            # after the scan. The kernel writes the pages back on its own
+            # and any subsequent reader sees them via the page cache.
+            if fsync:
+                out_m.flush()
+            # Header and bitmap are never touched again; release their dirty
+            # page-cache pressure promptly.
+            madvise_range(out_m, "MADV_DONTNEED", 0, h1.header_size)
+            madvise_range(out_m, "MADV_DONTNEED", out_bm_file_off, bm1_aligned)
+        finally:
+            out_m.close()
 
     print("Merged: %s + %s -> %s" % (cache1_path, cache2_path, out_path))
     print("  RW: %u + %u -> %u bytes at file offset 0x%x" % (
-        rw1["used"], rw2["used"], merged_rw_used, out_rw_file_off))
+        rw1_used, rw2_used, merged_rw_used, out_rw_file_off))
     print("  RO: %u + %u -> %u bytes at file offset 0x%x" % (
-        ro1["used"], ro2["used"], merged_ro_used, out_ro_file_off))
+        ro1_used, ro2_used, merged_ro_used, out_ro_file_off))
     print("  Pointer deltas: rw %+d, ro %+d" % (delta_rw, delta_ro))
 
 
 def main():
-    if len(sys.argv) != 4:
-        print("Usage: merge_aot_cache.py <cache1.aot> <cache2.aot> <merged.aot>", file=sys.stderr)
+    args = sys.argv[1:]
+    fsync = "--fsync" in args
+    if fsync:
+        args.remove("--fsync")
+    if len(args) != 3:
+        print("Usage: merge_aot_cache.py [--fsync] <cache1.aot> <cache2.aot> <merged.aot>\n"
+              "  --fsync  synchronously flush the merged file to disk before "
+              "exiting (default: leave writeback to the kernel)",
+              file=sys.stderr)
         sys.exit(1)
-    merge(sys.argv[1], sys.argv[2], sys.argv[3])
+    # Prefer the native port when it has been built (see merge_aotcache.c);
+    # it produces byte-identical output at full memory bandwidth. It never
+    # syncs, so an explicit --fsync stays on the Python path.
+    native = os.environ.get("AOTP_MERGE_BIN") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "merge_aotcache")
+    if not fsync and os.access(native, os.X_OK) and not os.path.isdir(native):
+        os.execv(native, [native] + args)
+    merge(args[0], args[1], args[2], fsync=fsync)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+/*
+ * Native port of merge-aotcache.py: merge two AOT cache files into one
+ * (single header, concatenated RW and RO regions, cache1's bitmap), with
+ * cache2's pointers relocated to the merged layout. Constants mirror the
+ * Python script; both produce byte-identical output. Assumes a
+ * little-endian host, like the caches themselves.
+ *
+ * Build (the relocation kernels live in _relocate.c):
+ *
+ *   cc -O3 -funroll-loops -o merge_aotcache merge_aotcache.c _relocate.c
+ *
+ * merge-aotcache.py execs this binary when it sits next to the script
+ * (or at $AOTP_MERGE_BIN) and falls back to the Python path otherwise.
+ */
+
+#include <errno.h>
+#include <fcntl.h>
+#include <inttypes.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+/* CDS layout (64-bit, matches cds.h and filemap.hpp) */
+#define REGIONS_START 24
+#define REGION_SIZE 96
+#define REGION_FILE_OFFSET_OFF 24
+#define REGION_USED_OFF 40
+#define CORE_ALIGNMENT_OFF 504
+#define REQUESTED_BASE_OFF 864
+
+/* Default shared base when header has requested_base_address == 0 */
+#define DEFAULT_SHARED_BASE UINT64_C(0x0000000800000000)
+
+void relocate_copy(uint64_t *dst, const uint64_t *src, size_t n,
+                   uint64_t b1, uint64_t e1, int64_t d1,
+                   uint64_t b2, uint64_t e2, int64_t d2);
+
+struct region {
+    uint64_t file_offset;
+    uint64_t used;
+};
+
+struct header {
+    uint32_t header_size;
+    uint64_t alignment;
+    uint64_t requested_base;
+    struct region rw, ro, bm;
+};
+
+static uint32_t rd_u32(const unsigned char *p, size_t off)
+{
+    uint32_t v;
+    memcpy(&v, p + off, sizeof v);
+    return v;
+}
+
+static uint64_t rd_u64(const unsigned char *p, size_t off)
+{
+    uint64_t v;
+    memcpy(&v, p + off, sizeof v);
+    return v;
+}
+
+static void wr_u32(unsigned char *p, size_t off, uint32_t v)
+{
+    memcpy(p + off, &v, sizeof v);
+}
+
+static void wr_u64(unsigned char *p, size_t off, uint64_t v)
+{
+    memcpy(p + off, &v, sizeof v);
+}
+
+static uint64_t align_up(uint64_t value, uint64_t alignment)
+{
+    if (alignment == 0)
+        return value;
+    return (value + alignment - 1) / alignment * alignment;
+}
+
+static void parse_region(const unsigned char *data, int i, struct region *r)
+{
+    size_t base = REGIONS_START + (size_t)i * REGION_SIZE;
+
+    r->file_offset = rd_u64(data, base + REGION_FILE_OFFSET_OFF);
+    r->used = rd_u64(data, base + REGION_USED_OFF);
+}
+
+static int parse_header(const unsigned char *data, size_t len, struct header *h)
+{
+    h->header_size = rd_u32(data, 12);
+    if (h->header_size > len) {
+        fprintf(stderr, "header_size %" PRIu32 " > file size %zu\n",
+                h->header_size, len);
+        return -1;
+    }
+    h->alignment = rd_u64(data, CORE_ALIGNMENT_OFF);
+    h->requested_base = rd_u64(data, REQUESTED_BASE_OFF);
+    parse_region(data, 0, &h->rw);
+    parse_region(data, 1, &h->ro);
+    parse_region(data, 2, &h->bm);
+    return 0;
+}
+
+static unsigned char *map_input(const char *path, size_t *len_out)
+{
+    int fd = open(path, O_RDONLY);
+    struct stat st;
+    void *m;
+
+    if (fd < 0 || fstat(fd, &st) != 0) {
+        perror(path);
+        exit(1);
+    }
+    m = mmap(NULL, (size_t)st.st_size, PROT_READ, MAP_SHARED
+#ifdef MAP_POPULATE
+             | MAP_POPULATE
+#endif
+             , fd, 0);
+    if (m == MAP_FAILED) {
+        perror(path);
+        exit(1);
+    }
+    close(fd);
+    *len_out = (size_t)st.st_size;
+    return (unsigned char *)m;
+}
+
+int main(int argc, char **argv)
+{
+    if (argc != 4) {
+        fprintf(stderr,
+                "Usage: merge_aotcache <cache1.aot> <cache2.aot> <merged.aot>\n");
+        return 1;
+    }
+    const char *cache1_path = argv[1];
+    const char *cache2_path = argv[2];
+    const char *out_path = argv[3];
+
+    size_t len1, len2;
+    unsigned char *m1 = map_input(cache1_path, &len1);
+    unsigned char *m2 = map_input(cache2_path, &len2);
+
+    struct header h1, h2;
+    if (parse_header(m1, len1, &h1) != 0 || parse_header(m2, len2, &h2) != 0)
+        return 1;
+
+    uint64_t alignment = h1.alignment;
+    uint64_t requested_base1 = h1.requested_base ? h1.requested_base
+                                                 : DEFAULT_SHARED_BASE;
+    uint64_t requested_base2 = h2.requested_base ? h2.requested_base
+                                                 : DEFAULT_SHARED_BASE;
+    if (h1.requested_base == 0 && h2.requested_base == 0)
+        fprintf(stderr, "Warning: requested_base_address is 0 in header; "
+                "using default 0x%" PRIx64 " for pointer relocation\n",
+                DEFAULT_SHARED_BASE);
+
+    uint64_t rw1_used = h1.rw.used, rw2_used = h2.rw.used;
+    uint64_t ro1_used = h1.ro.used, ro2_used = h2.ro.used;
+    uint64_t bm1_used = h1.bm.used;
+    uint64_t merged_rw_used = rw1_used + rw2_used;
+    uint64_t merged_ro_used = ro1_used + ro2_used;
+
+    /* Layout: [header][pad] [rw1+rw2] [pad] [ro1+ro2] [pad] [bm1] */
+    uint64_t out_rw_file_off = align_up(h1.header_size, alignment);
+    uint64_t out_ro_file_off = align_up(out_rw_file_off + merged_rw_used,
+                                        alignment);
+    uint64_t out_bm_file_off = align_up(out_ro_file_off + merged_ro_used,
+                                        alignment);
+    uint64_t bm1_aligned = align_up(bm1_used, alignment);
+    uint64_t total_size = out_bm_file_off + bm1_aligned;
+
+    /* Pointer deltas, same model as the Python script:
+     * abs = requested_base + file_offset */
+    uint64_t new_rw2_start = requested_base1 + out_rw_file_off + rw1_used;
+    uint64_t old_rw2_start = requested_base2 + h2.rw.file_offset;
+    int64_t delta_rw = (int64_t)(new_rw2_start - old_rw2_start);
+    uint64_t new_ro2_start = requested_base1 + out_ro_file_off + ro1_used;
+    uint64_t old_ro2_start = requested_base2 + h2.ro.file_offset;
+    int64_t delta_ro = (int64_t)(new_ro2_start - old_ro2_start);
+
+    int out_fd = open(out_path, O_RDWR | O_CREAT | O_TRUNC, 0644);
+    if (out_fd < 0) {
+        perror(out_path);
+        return 1;
+    }
+#ifdef __linux__
+    if (posix_fallocate(out_fd, 0, (off_t)total_size) != 0)
+#endif
+    if (ftruncate(out_fd, (off_t)total_size) != 0) {
+        perror(out_path);
+        return 1;
+    }
+    unsigned char *out_m = mmap(NULL, total_size, PROT_READ | PROT_WRITE,
+                                MAP_SHARED, out_fd, 0);
+    if (out_m == MAP_FAILED) {
+        perror(out_path);
+        return 1;
+    }
+
+    /* Header from cache1, then patch rw/ro/bm file_offset+used, zero CRCs */
+    memcpy(out_m, m1, h1.header_size);
+    size_t r0 = REGIONS_START + 0 * REGION_SIZE;
+    size_t r1 = REGIONS_START + 1 * REGION_SIZE;
+    size_t r2 = REGIONS_START + 2 * REGION_SIZE;
+    wr_u64(out_m, r0 + REGION_FILE_OFFSET_OFF, out_rw_file_off);
+    wr_u64(out_m, r0 + REGION_USED_OFF, merged_rw_used);
+    wr_u64(out_m, r1 + REGION_FILE_OFFSET_OFF, out_ro_file_off);
+    wr_u64(out_m, r1 + REGION_USED_OFF, merged_ro_used);
+    wr_u64(out_m, r2 + REGION_FILE_OFFSET_OFF, out_bm_file_off);
+    wr_u64(out_m, r2 + REGION_USED_OFF, bm1_used);
+    wr_u32(out_m, 4, 0);
+    wr_u32(out_m, r0, 0);
+    wr_u32(out_m, r1, 0);
+
+    /* RW then RO: cache1 verbatim, cache2 fused copy+relocate. The tail
+     * bytes of an unaligned region are copied unmodified. */
+    memcpy(out_m + out_rw_file_off, m1 + h1.rw.file_offset, rw1_used);
+    uint64_t rw2_off = out_rw_file_off + rw1_used;
+    relocate_copy((uint64_t *)(out_m + rw2_off),
+                  (const uint64_t *)(m2 + h2.rw.file_offset), rw2_used / 8,
+                  old_rw2_start, old_rw2_start + rw2_used, delta_rw,
+                  old_ro2_start, old_ro2_start + ro2_used, delta_ro);
+    memcpy(out_m + rw2_off + rw2_used / 8 * 8,
+           m2 + h2.rw.file_offset + rw2_used / 8 * 8, rw2_used % 8);
+
+    memcpy(out_m + out_ro_file_off, m1 + h1.ro.file_offset, ro1_used);
+    uint64_t ro2_off = out_ro_file_off + ro1_used;
+    relocate_copy((uint64_t *)(out_m + ro2_off),
+                  (const uint64_t *)(m2 + h2.ro.file_offset), ro2_used / 8,
+                  old_rw2_start, old_rw2_start + rw2_used, delta_rw,
+                  old_ro2_start, old_ro2_start + ro2_used, delta_ro);
+    memcpy(out_m + ro2_off + ro2_used / 8 * 8,
+           m2 + h2.ro.file_offset + ro2_used / 8 * 8, ro2_used % 8);
+
+    /* Bitmap from cache1; the fallocate/ftruncate padding is already zero */
+    if (bm1_used > 0)
+        memcpy(out_m + out_bm_file_off, m1 + h1.bm.file_offset, bm1_used);
+
+    /* No msync: the kernel writes the dirty pages back asynchronously and
+     * any reader sees them through the page cache immediately. */
+    munmap(out_m, total_size);
+    close(out_fd);
+    munmap(m1, len1);
+    munmap(m2, len2);
+
+    printf("Merged: %s + %s -> %s\n", cache1_path, cache2_path, out_path);
+    printf("  RW: %" PRIu64 " + %" PRIu64 " -> %" PRIu64
+           " bytes at file offset 0x%" PRIx64 "\n",
+           rw1_used, rw2_used, merged_rw_used, out_rw_file_off);
+    printf("  RO: %" PRIu64 " + %" PRIu64 " -> %" PRIu64
+           " bytes at file offset 0x%" PRIx64 "\n",
+           ro1_used, ro2_used, merged_ro_used, out_ro_file_off);
+    printf("  Pointer deltas: rw %+" PRId64 ", ro %+" PRId64 "\n",
+           delta_rw, delta_ro);
+    return 0;
+}